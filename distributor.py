@@ -8,8 +8,9 @@ License: Apache-2.0
 """
 
 
+import heapq
+
 from math import ceil
-from intervaltree import IntervalTree
 
 DEFAULT_OPTIONS = {
     "algorithm": "overlap",
@@ -105,16 +106,10 @@ class Distributor(object):
             currentLayerWidth = puntedWidth
             puntedNodes = []
 
-            while (
-                len(nodesInCurrentLayer) > 2 and currentLayerWidth > maxWidth
-            ):
-                # Sort by overlaps
-                nodesInCurrentLayer.sort(
-                    key=lambda x: x.overlapCount, reverse=True
-                )
-
+            queue = OverlapQueue(nodesInCurrentLayer)
+            while queue.size > 2 and currentLayerWidth > maxWidth:
                 # Remove the node with the most overlap
-                first = nodesInCurrentLayer.pop(0)
+                first = queue.pop()
 
                 # Update width
                 currentLayerWidth -= first.width
@@ -123,10 +118,11 @@ class Distributor(object):
                 # Update overlap count for the remaining nodes
                 for node in first.overlaps:
                     node.overlapCount -= 1
+                    queue.touch(node)
 
                 puntedNodes.append(first)
 
-            layers.append(nodesInCurrentLayer)
+            layers.append(queue.nodes())
 
             puntedWidth = self.computeRequiredWidth(puntedNodes)
 
@@ -152,11 +148,90 @@ class Distributor(object):
         return layers
 
     def countIdealOverlaps(self, nodes):
-        iTree = IntervalTree()
+        # Sweep over the nodes by their ideal left edge. The heap holds the
+        # nodes whose interval is still open at the current left edge, so
+        # only overlapping pairs are ever visited.
         for node in nodes:
-            iTree.addi(node.idealLeft(), node.idealRight(), data=node)
+            node.overlaps = []
+        active = []
+        order = sorted(range(len(nodes)), key=lambda i: nodes[i].idealLeft())
+        for i in order:
+            node = nodes[i]
+            left = node.idealLeft()
+            right = node.idealRight()
+            while active and active[0][0] <= left:
+                heapq.heappop(active)
+            if not left < right:
+                continue
+            for _, _, other in active:
+                other.overlaps.append(node)
+                node.overlaps.append(other)
+            node.overlaps.append(node)
+            heapq.heappush(active, (right, i, node))
 
         for node in nodes:
-            overlaps = iTree.overlap(node.idealLeft(), node.idealRight())
-            node.overlaps = [x.data for x in overlaps]
-            node.overlapCount = len(overlaps)
+            node.overlapCount = len(node.overlaps)
+
+
+class OverlapQueue(object):
+    """Pop nodes in order of decreasing overlapCount.
+
+    Labella.js re-sorts the whole layer by overlapCount before every pop,
+    which is quadratic in the number of nodes. This queue yields the same
+    order (including the tie-breaking of a stable sort) but only moves the
+    nodes whose count changed since the previous pop.
+    """
+
+    def __init__(self, nodes):
+        self._nodes = nodes
+        self._popped = False
+        self._key = {}
+        self._seq = {}
+        self._buckets = {}
+        self._pending = []
+        self._front = 0
+        self._top = max((n.overlapCount for n in nodes), default=0)
+        for i, node in enumerate(nodes):
+            self._push(node, node.overlapCount, i)
+        self.size = len(nodes)
+
+    def _push(self, node, key, seq):
+        self._key[node] = key
+        self._seq[node] = seq
+        heapq.heappush(self._buckets.setdefault(key, []), (seq, node))
+        self._top = max(self._top, key)
+
+    def _reorder(self):
+        # A stable sort moves a node whose count dropped to the front of its
+        # new bucket, keeping the relative order of nodes that moved together.
+        pending = sorted(
+            self._pending, key=lambda n: (-self._key[n], self._seq[n])
+        )
+        self._front -= len(pending)
+        for i, node in enumerate(pending):
+            self._push(node, node.overlapCount, self._front + i)
+        self._pending = []
+
+    def touch(self, node):
+        if node in self._key:
+            self._pending.append(node)
+
+    def pop(self):
+        self._reorder()
+        while True:
+            bucket = self._buckets.get(self._top)
+            while bucket:
+                seq, node = heapq.heappop(bucket)
+                if self._seq.get(node) == seq:
+                    del self._key[node]
+                    del self._seq[node]
+                    self.size -= 1
+                    self._popped = True
+                    return node
+            self._top -= 1
+
+    def nodes(self):
+        """Remaining nodes, in the order of the last sort before a pop."""
+        if not self._popped:
+            return self._nodes
+        return sorted(self._seq, key=lambda n: (-self._key[n], self._seq[n]))
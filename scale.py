@@ -14,6 +14,7 @@ from datetime import datetime
 from d3_time import d3_time
 
 d3_identity = lambda x: x
+d3_functor = lambda v: v if callable(v) else lambda *args: v
 dt2milli = lambda x: x.timestamp() * 1000.0
 milli2dt = lambda x: datetime.fromtimestamp(x / 1000.0)
 
@@ -48,9 +49,8 @@ def d3_interpolateNumber(a, b):
 
 
 def d3_extent(data, fn):
-    minval = min([fn(x) for x in data])
-    maxval = max([fn(x) for x in data])
-    return [minval, maxval]
+    values = [fn(x) for x in data]
+    return [min(values), max(values)]
 
 
 def d3_scaleExtent(domain):
@@ -19,7 +19,7 @@ import os
 
 from node import Node
 from force import Force
-from scale import TimeScale, d3_extent
+from scale import TimeScale, d3_extent, d3_functor
 
 TIMELINE_DEFAULT_OPTIONS = {
     "margin": {"left": 20, "right": 20, "top": 20, "bottom": 20},
@@ -32,7 +32,7 @@ TIMELINE_DEFAULT_OPTIONS = {
     "layerGap": 60,
     "labella": {},
     "timeFn": lambda d: d["time"],
-    "textFn": lambda d: d["text"] if "text" in d else None,
+    "textFn": lambda d: d.get("text"),
     "dotColor": "#222",
     "labelBgColor": "#222",
     "labelTextColor": "#fff",
@@ -61,6 +61,8 @@ DEFAULT_HEIGHT = 35
 TEXT_WIDTH_MULTI = 2
 
 class Item(object):
+    __slots__ = ("time", "text", "width", "height", "data", "output_mode")
+
     def __init__(
         self,
         time,
@@ -99,43 +101,96 @@ class Item(object):
 
 class Timeline(object):
     def __init__(self, dicts, options=None, output_mode="svg"):
-        # update timeline options
-        self.options = {k: v for k, v in TIMELINE_DEFAULT_OPTIONS.items()}
-        if options:
-            self.options.update(options)
+        # update timeline options, without mutating the shared defaults
+        self.options = {**TIMELINE_DEFAULT_OPTIONS, **(options or {})}
         self.direction = self.options["direction"]
-        self.options["labella"]["direction"] = self.direction
+        self.options["labella"] = {
+            **TIMELINE_DEFAULT_OPTIONS["labella"],
+            **self.options["labella"],
+            "direction": self.direction,
+        }
+        if self.options["scale"] is TIMELINE_DEFAULT_OPTIONS["scale"]:
+            self.options["scale"] = self.options["scale"].copy()
+        # the margins and initial size are not changed after construction
+        self._innerWidth = (
+            self.options["initialWidth"]
+            - self.options["margin"]["left"]
+            - self.options["margin"]["right"]
+        )
+        self._innerHeight = (
+            self.options["initialHeight"]
+            - self.options["margin"]["top"]
+            - self.options["margin"]["bottom"]
+        )
+        padding = self.options["labelPadding"]
+        self._pad_w = padding["left"] + padding["right"]
+        self._pad_h = padding["top"] + padding["bottom"]
+        self._horizontal = self.direction in ("left", "right")
+        nodePos = {
+            "right": self._nodePos_right,
+            "left": self._nodePos_left,
+            "up": self._nodePos_up,
+            "down": self._nodePos_down,
+        }
+        if not self.direction in nodePos:
+            raise ValueError(self.direction)
+        self.nodePos = nodePos[self.direction]
+        self.init_colors()
+        self._text_fn = self.options["textFn"]
+        self._nodeHeight = None
         # parse items
         self.items = self.parse_items(dicts, output_mode=output_mode)
         self.equal_heights()
         self.rotate_items()
         self.init_axis(dicts)
 
+    def init_colors(self):
+        self._color_fns = {}
+        for name in (
+            "dotColor",
+            "linkColor",
+            "labelBgColor",
+            "labelTextColor",
+            "borderColor",
+        ):
+            color = self.options[name]
+            if isinstance(color, list):
+                fn = lambda d, i, lst=color: lst[i % len(lst)]
+            else:
+                fn = lambda d, i, f=d3_functor(color): f(d)
+            self._color_fns[name] = fn
+
     def equal_heights(self):
-        maxheight = max((x.height for x in self.items))
         for item in self.items:
             if item.text:
-                item.height = maxheight
+                item.height = self._max_height
 
     def rotate_items(self):
-        if self.direction in ["left", "right"]:
+        if self._horizontal:
             for item in self.items:
                 if item.text:
                     item.height, item.width = item.width, item.height
 
     def parse_items(self, dicts, output_mode="svg"):
+        text_fn = self._text_fn or (lambda d: d.get("text"))
+        label_height = self.options["labelHeight"]
+        _combine = datetime.datetime.combine
+        _min_time = datetime.datetime.min.time()
+        _today = datetime.date.today()
+        _date_cls = datetime.date
+        _time_cls = datetime.time
+        _dt_cls = datetime.datetime
         items = []
+        max_height = 0
         for d in dicts:
             time = d["time"]
-            if isinstance(time, datetime.date):
-                time = datetime.datetime.combine(
-                    time, datetime.datetime.min.time()
-                )
+            if isinstance(time, _date_cls) and not isinstance(time, _dt_cls):
+                time = _combine(time, _min_time)
                 d["time"] = time
-            elif isinstance(time, datetime.time):
-                time = datetime.datetime.combine(datetime.date.today(), time)
+            elif isinstance(time, _time_cls):
+                time = _combine(_today, time)
                 d["time"] = time
-            text = self.textFn(d)
+            text = text_fn(d)
             if text:
                 width = d.get("width", None)
             else:
@@ -146,9 +201,12 @@ class Timeline(object):
                 text=text,
                 data=d,
                 output_mode=output_mode,
-                height=self.options["labelHeight"]
+                height=label_height,
             )
             items.append(it)
+            max_height = max(max_height, it.height)
+        # used by equal_heights, saves a separate pass over the items
+        self._max_height = max_height
         return items
 
     def init_axis(self, data):
@@ -160,53 +218,52 @@ class Timeline(object):
             )
             self.options["scale"].nice()
         innerWidth, innerHeight = self.getInnerDims()
-        if self.options["direction"] in ["left", "right"]:
+        if self._horizontal:
             self.options["scale"].range([0, innerHeight])
         else:
             self.options["scale"].range([0, innerWidth])
+        # the cached scale positions, both per timestamp and per item, are
+        # stale once the axis changes
+        self._time_cache = {}
+        self.init_positions()
+
+    def init_positions(self):
+        # evaluate the scale once per item, get_nodes reuses the positions
+        self.positions = [self.timePos(it.data) for it in self.items]
 
     def getInnerDims(self):
-        innerWidth = (
-            self.options["initialWidth"]
-            - self.options["margin"]["left"]
-            - self.options["margin"]["right"]
-        )
-        innerHeight = (
-            self.options["initialHeight"]
-            - self.options["margin"]["top"]
-            - self.options["margin"]["bottom"]
-        )
-        return innerWidth, innerHeight
+        return self._innerWidth, self._innerHeight
+
+    def _iter_raw_nodes(self):
+        for it, pos in zip(self.items, self.positions):
+            yield Node(pos, it.width, data=it)
+
+    def _finalize_node(self, node):
+        node.w = node.data.width + self._pad_w
+        node.h = node.data.height + self._pad_h
+        if self._horizontal:
+            node.h, node.w = node.w, node.h
+            node.width = node.h
+        else:
+            node.width = node.w
+        return node
 
     def get_nodes(self):
-        nodes = []
-        for it in self.items:
-            n = Node(self.timePos(it.data), it.width, data=it)
-            nodes.append(n)
-        for node in nodes:
-            node.w = (
-                node.data.width
-                + self.options["labelPadding"]["left"]
-                + self.options["labelPadding"]["right"]
-            )
-            node.h = (
-                node.data.height
-                + self.options["labelPadding"]["top"]
-                + self.options["labelPadding"]["bottom"]
+        return [self._finalize_node(n) for n in self._iter_raw_nodes()]
+
+    def nodeHeight(self):
+        # The node extent across the axis is the item height plus padding in
+        # every direction (get_nodes swaps w/h for horizontal timelines). The
+        # items do not change after construction, so compute it only once.
+        if self._nodeHeight is None:
+            self._nodeHeight = (
+                max((it.height for it in self.items)) + self._pad_h
             )
-            if self.options["direction"] in ["left", "right"]:
-                node.h, node.w = node.w, node.h
-                node.width = node.h
-            else:
-                node.width = node.w
-        return nodes
+        return self._nodeHeight
 
     def compute(self):
         nodes = self.get_nodes()
-        if self.direction in ["left", "right"]:
-            nodeHeight = max((n.w for n in nodes))
-        else:
-            nodeHeight = max((n.h for n in nodes))
+        nodeHeight = self.nodeHeight()
         renderer = Renderer(
             {
                 "nodeHeight": nodeHeight,
@@ -214,7 +271,9 @@ class Timeline(object):
                 "direction": self.options["direction"],
             }
         )
-        renderer.layout(nodes)
+        # Force only reads the positions and widths of the nodes, while the
+        # renderer needs the layerIndex and currentPos set by Force. A single
+        # layout after the force computation is therefore enough.
         force = Force(self.options["labella"])
         force.nodes(nodes)
         force.compute()
@@ -229,10 +288,7 @@ class Timeline(object):
         return force.nodes()
 
     def colorFunc(self, colorName, thedict, i=0):
-        if isinstance(self.options[colorName], list):
-            return self.options[colorName][i % len(self.options[colorName])]
-        theColor = d3_functor(self.options[colorName])
-        return theColor(thedict)
+        return self._color_fns[colorName](thedict, i)
 
     def dotColor(self, thedict, i=0):
         return self.colorFunc("dotColor", thedict, i=i)
@@ -250,23 +306,29 @@ class Timeline(object):
         return self.colorFunc("borderColor", thedict, i=i)
 
     def textFn(self, thedict):
-        if self.options["textFn"] is None:
-            if not "text" in thedict:
-                return None
-            return thedict.get("text", None)
-        return self.options["textFn"](thedict)
-
-    def nodePos(self, d, nodeHeight):
-        if self.direction == "right":
-            return (d.x, d.y - d.dy / 2)
-        elif self.direction == "left":
-            return (d.x - d.w + d.dx, d.y - d.dy / 2)
-        elif self.direction == "up":
-            return (d.x - d.dx / 2, d.y)
-        elif self.direction == "down":
-            return (d.x - d.dx / 2, d.y)
+        if self._text_fn is None:
+            return thedict.get("text")
+        return self._text_fn(thedict)
+
+    def _nodePos_right(self, d, nodeHeight):
+        return (d.x, d.y - d.dy / 2)
+
+    def _nodePos_left(self, d, nodeHeight):
+        return (d.x - d.w + d.dx, d.y - d.dy / 2)
+
+    def _nodePos_up(self, d, nodeHeight):
+        return (d.x - d.dx / 2, d.y)
+
+    def _nodePos_down(self, d, nodeHeight):
+        return (d.x - d.dx / 2, d.y)
 
     def timePos(self, thedict):
+        key = self.options["timeFn"](thedict)
         if self.options["scale"] is None:
-            return self.options["timeFn"](thedict)
-        return self.options["scale"](self.options["timeFn"](thedict))
+            return key
+        # many items can share a timestamp, evaluate the scale once for each
+        pos = self._time_cache.get(key)
+        if pos is None:
+            pos = self.options["scale"](key)
+            self._time_cache[key] = pos
+        return pos